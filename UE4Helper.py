@@ -9,12 +9,76 @@
 import maya.cmds as cmds
 import maya.mel as mel
 import ConfigParser
+import hashlib
+import json
 import operator
-from os import path, listdir
+import re
+import threading
+from os import path, listdir, remove, rename, fsync
 from functools import partial
+import UE4HelperMeshData
+#NumPy is not shipped with every Maya version
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
-UE4HELPER_VERISION = 0.9 
+UE4HELPER_VERISION = 1.3
 UE4HELPER_SETTINGSPATH = cmds.internalVar(userPrefDir=True) + '/UE4Helper.ini'
+#Length of each unit in centimeters, the unit UE4 uses
+UNIT_TO_CENTIMETER = {'Millimeter':0.1, 'Centimeter':1.0, 'Meter':100.0,
+                      'Kilometer':100000.0, 'Inch':2.54, 'Foot':30.48,
+                      'Yard':91.44, 'Mile':160934.4}
+UNIT_LABELS = ['Millimeter', 'Centimeter', 'Meter', 'Kilometer',
+               'Inch', 'Foot', 'Yard', 'Mile']
+#Imported references share this namespace so they can be removed together
+REFERENCE_NAMESPACE = 'UE4Ref'
+REFERENCE_SPACING = 50.0
+#Exports are written to a .part file first and renamed when complete
+EXPORT_JOURNAL = 'UE4Helper_export.journal'
+EXPORT_TEMP_SUFFIX = '.part'
+
+
+def convertUnits(values, fromUnit, toUnit):
+    """
+    Converts a value, a list of values or columns of values between units
+    using UNIT_TO_CENTIMETER. NumPy arrays are converted in a single multiply.
+
+    Returns:
+        Converted values in the same shape as values
+    """
+    factor = UNIT_TO_CENTIMETER[fromUnit] / UNIT_TO_CENTIMETER[toUnit]
+    if isinstance(values, (list, tuple)):
+        return [convertUnits(value, fromUnit, toUnit) for value in values]
+    return values * factor
+
+
+def prefetchFiles(filePaths, threadCount=4):
+    """
+    Reads files in background threads so files on slow network drives are
+    cached before Maya imports them one at a time.
+
+    Returns:
+        List of threading.Event set once each file has been read or failed
+    """
+    events = [threading.Event() for filePath in filePaths]
+    def prefetch(threadIndex):
+        #Each thread reads every threadCount file in import order
+        for filePath, event in list(zip(filePaths, events))[threadIndex::threadCount]:
+            try:
+                with open(filePath, 'rb') as prefetchFile:
+                    while prefetchFile.read(1048576):
+                        pass
+            except IOError:
+                pass
+            finally:
+                #Waiting imports must never block on a failed read
+                event.set()
+    for threadIndex in range(min(threadCount, len(filePaths))):
+        thread = threading.Thread(target=prefetch, args=(threadIndex,))
+        thread.daemon = True
+        thread.start()
+    return events
 
 
 class Settings(ConfigParser.RawConfigParser):
@@ -48,6 +112,13 @@ class Settings(ConfigParser.RawConfigParser):
         self.set('settings', 'exportFBX', 'true')
         self.set('settings', 'exportOBJ', 'false')
         self.set('settings', 'centerMeshes', 'true')
+        self.set('settings', 'normalizeVertices', 'false')
+        self.set('settings', 'cleanupMeshes', 'false')
+        self.set('settings', 'cleanupTolerance', '0.001')
+        self.set('settings', 'validateLightmaps', 'false')
+        self.set('settings', 'blockInvalidLightmaps', 'false')
+        self.set('settings', 'lightmapResolution', '64')
+        self.set('settings', 'exportTangents', 'false')
         self._updateConfigFile()
 
     def _updateConfigFile(self):
@@ -99,11 +170,91 @@ class Settings(ConfigParser.RawConfigParser):
         return referenceFiles
 
 
+class ExportJournal(object):
+    """
+    Records the state of each exported file as JSON lines in the export
+    folder so an interrupted export can be resumed. The last line written
+    for a file is its current state.
+    """
+    def __init__(self, exportDir, resume=False):
+        self.path = exportDir + EXPORT_JOURNAL
+        self._entries = {}
+        line = ''
+        if resume and path.isfile(self.path):
+            with open(self.path) as journalFile:
+                for line in journalFile:
+                    #A crash can leave the last line half written
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._entries[entry['file']] = entry
+        self._journalFile = open(self.path, 'a' if resume else 'w')
+        #Starts a new line after a half written one
+        if line and not line.endswith('\n'):
+            self._journalFile.write('\n')
+
+    def _record(self, entry):
+        """
+        Writes entry to disk before returning so it survives a crash
+        """
+        self._entries[entry['file']] = entry
+        self._journalFile.write(json.dumps(entry) + '\n')
+        self._journalFile.flush()
+        fsync(self._journalFile.fileno())
+
+    def _checksum(self, filePath):
+        """
+        Returns:
+            MD5 hex digest of the file at filePath
+        """
+        md5 = hashlib.md5()
+        with open(filePath, 'rb') as exportFile:
+            for chunk in iter(partial(exportFile.read, 1048576), b''):
+                md5.update(chunk)
+        return md5.hexdigest()
+
+    def started(self, fileName):
+        """
+        Records fileName as being written
+        """
+        self._record({'file':fileName, 'state':'started'})
+
+    def completed(self, fileName, filePath):
+        """
+        Records fileName as complete with the size and checksum of filePath
+        """
+        self._record({'file':fileName, 'state':'complete',
+                      'size':path.getsize(filePath), 'md5':self._checksum(filePath)})
+
+    def isComplete(self, fileName):
+        """
+        Checks the journal has fileName as complete and the file on disk
+        still matches its recorded size and checksum.
+        """
+        entry = self._entries.get(fileName)
+        if not entry or entry['state'] != 'complete':
+            return False
+        filePath = path.join(path.dirname(self.path), fileName)
+        if not path.isfile(filePath) or path.getsize(filePath) != entry['size']:
+            return False
+        return self._checksum(filePath) == entry['md5']
+
+    def close(self):
+        """
+        Closes the journal file
+        """
+        self._journalFile.close()
+
+
 class UE4Helper(object):
     def __init__(self):
         self._settings = Settings(version=UE4HELPER_VERISION, settingsPath=UE4HELPER_SETTINGSPATH)
         self._howToUse = UE4HelperHowToUse()
+        self._meshData = UE4HelperMeshData.MeshDataCache(UE4HelperMeshData.MayaMeshBackend())
         self._buildUi()
+        #Removes the cache callbacks when the window is closed
+        cmds.scriptJob(uiDeleted=[self._window, self._meshData.close])
         self._setupSettingsUi()
         mel.eval('FBXExportSmoothingGroups -v true')
 
@@ -111,7 +262,7 @@ class UE4Helper(object):
         #check to make sure window is not already open
         if cmds.window("UE4Helper", exists = True):
             cmds.deleteUI("UE4Helper")
-        self._window = cmds.window("UE4Helper", t="UE4 Helper", mb=True, w=208, h=290,
+        self._window = cmds.window("UE4Helper", t="UE4 Helper", mb=True, w=208, h=355,
                                 mnb=False, mxb=False, s=False, rtf=True)
         #Menus
         #Create a function to auto generate the menus based off the settings / .ini file
@@ -120,6 +271,7 @@ class UE4Helper(object):
         cmds.menuItem(self._menuModelRefDir, edit=True,
             c=partial(self._setReferenceFolder))
         cmds.menuItem(l='Refresh References',c=partial(self._updateReferenceUi))
+        cmds.menuItem(l='Remove References',c=partial(self._removeReferences))
         cmds.menuItem(d=True)
         self._menuExportDir = cmds.menuItem(l='Export Folder')
         cmds.menuItem(self._menuExportDir, edit=True,
@@ -133,6 +285,22 @@ class UE4Helper(object):
         self._menuCenterMeshes = cmds.menuItem(l='Center Meshes', cb=False)
         cmds.menuItem(self._menuCenterMeshes, edit=True,
             c=partial(self._settings.updateConfig,self._menuCenterMeshes, 'centerMeshes'))
+        self._menuCleanupMeshes = cmds.menuItem(l='Cleanup Meshes', cb=False)
+        cmds.menuItem(self._menuCleanupMeshes, edit=True,
+            c=partial(self._settings.updateConfig,self._menuCleanupMeshes, 'cleanupMeshes'))
+        self._menuValidateLightmaps = cmds.menuItem(l='Validate Lightmaps', cb=False)
+        cmds.menuItem(self._menuValidateLightmaps, edit=True,
+            c=partial(self._settings.updateConfig,self._menuValidateLightmaps, 'validateLightmaps'))
+        self._menuBlockInvalidLightmaps = cmds.menuItem(l='Block Invalid Lightmaps', cb=False)
+        cmds.menuItem(self._menuBlockInvalidLightmaps, edit=True,
+            c=partial(self._settings.updateConfig,self._menuBlockInvalidLightmaps, 'blockInvalidLightmaps'))
+        self._menuExportTangents = cmds.menuItem(l='Export FBX Tangents', cb=False)
+        cmds.menuItem(self._menuExportTangents, edit=True,
+            c=partial(self._settings.updateConfig,self._menuExportTangents, 'exportTangents'))
+        cmds.menuItem(d=True)
+        self._menuNormalizeVertices = cmds.menuItem(l='Normalize Vertices', cb=False)
+        cmds.menuItem(self._menuNormalizeVertices, edit=True,
+            c=partial(self._settings.updateConfig,self._menuNormalizeVertices, 'normalizeVertices'))
 
         cmds.menu(l='Help', hm=True)
         cmds.menuItem(l='How to Use', c=self._howToUse.toggle)
@@ -162,9 +330,9 @@ class UE4Helper(object):
         cmds.separator(w=194, h=20, st="double")
         #Reference Import
         cmds.rowLayout(nc=2)
-        self._refOptionMenu = cmds.optionMenu(w=140, h=25)
-        cmds.menuItem(l='Set Reference Folder')
-        cmds.button(l="Import", w=50, c=partial(self._importReference))
+        self._refList = cmds.textScrollList(w=140, h=60, ams=True,
+            append=['Set Reference Folder'])
+        cmds.button(l="Import", w=50, h=60, c=partial(self._importReference))
         cmds.setParent('..')
         cmds.separator(w=194, h=5, st="none")
         #Rename Mesh
@@ -183,13 +351,23 @@ class UE4Helper(object):
           ann='Select collision meshes, then target mesh and click', 
           c=partial(self.assignCollision))
         cmds.separator(w=194, h=5, st="none")
+        #Auto Match
+        cmds.button(l="Auto Match", w=194,
+          ann='Select loose collision or LOD meshes and click',
+          c=partial(self.autoMatch))
+        cmds.separator(w=194, h=5, st="none")
         #Export
-        cmds.button(l="Export", w=194, c=partial(self.export))
+        cmds.rowLayout(nc=2)
+        cmds.button(l="Export", w=95, c=partial(self.export))
+        cmds.button(l="Resume Export", w=95,
+          ann='Exports selected meshes skipping files already exported',
+          c=partial(self.resumeExport))
+        cmds.setParent('..')
         cmds.separator(w=194, h=5, st= "none")
         #Length Converter
         cmds.frameLayout( l='Unit Converter', cll=1, w=194, cl=1,
-            cc=partial(cmds.window, self._window, e=True, w=208, h=290),
-            ec=partial(cmds.window, self._window, e=True, w=208, h=335))
+            cc=partial(cmds.window, self._window, e=True, w=208, h=355),
+            ec=partial(cmds.window, self._window, e=True, w=208, h=430))
         cmds.rowColumnLayout(nc=3, cw=[(1, 87), (2, 20), (3, 87)])
         self._unit1Val = cmds.textField("ConvertValue1",ec=partial(self._convertUnits,True))
         cmds.text(l="=")
@@ -198,38 +376,35 @@ class UE4Helper(object):
         cmds.separator(h=5, st="none")
         cmds.separator(h=5, st="none")
         self._unit1Option = cmds.optionMenu(cc=partial(self._convertUnits,False))
-        cmds.menuItem(l='Millimeter')
-        cmds.menuItem(l='Centimeter')
-        cmds.menuItem(l='Meter')
-        cmds.menuItem(l='Kilometer')
-        cmds.menuItem(l='Inch')
-        cmds.menuItem(l='Foot')
-        cmds.menuItem(l='Yard')
-        cmds.menuItem(l='Mile')
+        for unit in UNIT_LABELS:
+            cmds.menuItem(l=unit)
         cmds.optionMenu(self._unit1Option, e=True, value='Inch')
         cmds.text(l="to")
         self._unit2Option = cmds.optionMenu(cc=partial(self._convertUnits,True))
-        cmds.menuItem(l='Millimeter')
-        cmds.menuItem(l='Centimeter')
-        cmds.menuItem(l='Meter')
-        cmds.menuItem(l='Kilometer')
-        cmds.menuItem(l='Inch')
-        cmds.menuItem(l='Foot')
-        cmds.menuItem(l='Yard')
-        cmds.menuItem(l='Mile')
+        for unit in UNIT_LABELS:
+            cmds.menuItem(l=unit)
         cmds.optionMenu(self._unit2Option, e=True, value='Centimeter')
         cmds.setParent('..')
+        cmds.separator(h=5, st="none")
+        cmds.button(l="Normalize Units", w=194,
+          ann='Rescales selected or all SM_ assets from the left unit to centimeters',
+          c=partial(self.normalizeUnits))
         cmds.setParent('..')
         cmds.showWindow()
         #Ensures window is the proper size
-        cmds.window(self._window, e=True, w=208, h=290)
+        cmds.window(self._window, e=True, w=208, h=355)
 
     def _setupSettingsUi(self, *args):
         for menuRef, setting in {self._menuModelRefDir:'modelRefDir',
                                 self._menuExportDir:'exportDir',
                                 self._menuExportFBX:'exportFBX',
                                 self._menuExportOBJ:'exportOBJ',
-                                self._menuCenterMeshes:'centerMeshes'}.items():
+                                self._menuCenterMeshes:'centerMeshes',
+                                self._menuNormalizeVertices:'normalizeVertices',
+                                self._menuCleanupMeshes:'cleanupMeshes',
+                                self._menuValidateLightmaps:'validateLightmaps',
+                                self._menuBlockInvalidLightmaps:'blockInvalidLightmaps',
+                                self._menuExportTangents:'exportTangents'}.items():
             menuVal = str(self._settings.get('settings', setting))
             menul = cmds.menuItem(menuRef, query=True, l=True)
             cmds.menuItem(menuRef, e=True, cb=menuVal=='true', ann=menul+" - "+menuVal)
@@ -275,6 +450,15 @@ class UE4Helper(object):
             return sceneObjShort[4:-3]
         return sceneObj
 
+    def _findMainMesh(self, renderMeshName, *args):
+        """
+        Finds the top most mesh or group using primary mesh name.
+        """
+        meshes = self._getMeshes(renderMeshName)
+        if meshes:
+            return meshes[0]
+        return renderMeshName
+
     def _getMeshes(self, renderMeshName):
         """
         Gets all meshes using primary mesh name.
@@ -316,6 +500,173 @@ class UE4Helper(object):
                     objExists = True
         return meshes
 
+    def _meshShapes(self, nodes, *args):
+        """
+        Finds the mesh shapes under nodes, skipping intermediate objects.
+
+        Returns:
+            List of long names of the mesh shapes
+        """
+        return cmds.listRelatives(nodes, ad=True, f=True, type='mesh', ni=True) or []
+
+    def _meshArrays(self, mesh, *args):
+        """
+        Gets the points, face and triangle arrays of a mesh shape from the
+        mesh data cache.
+
+        Returns:
+            Tuple of points, faceCounts, faceConnects, triangleCounts, triangleConnects
+        """
+        meshData = self._meshData.get(mesh)
+        return (meshData.array('points', 3), meshData.array('faceCounts'),
+                meshData.array('faceConnects'), meshData.array('triangleCounts'),
+                meshData.array('triangleConnects'))
+
+    def _cleanupMeshes(self, mainMesh, *args):
+        """
+        Removes zero area faces and welds duplicate vertices of every mesh
+        under mainMesh within the cleanupTolerance setting and reports the changes.
+        Maya is only asked to delete or merge when NumPy finds something, so
+        clean meshes get no new history.
+
+        Warnings:
+            ' has non-manifold edges: '
+        """
+        tolerance = self._settings.getfloat('settings', 'cleanupTolerance')
+        report = {'duplicateVertices':0, 'degenerateTriangles':0,
+                  'nonManifoldEdges':0, 'zeroAreaFaces':0}
+        for mesh in self._meshShapes(mainMesh):
+            points, faceCounts, faceConnects, triangleCounts, triangleConnects = self._meshArrays(mesh)
+            problems = UE4HelperMeshData.findMeshProblems(points, faceCounts, triangleCounts, triangleConnects, tolerance)
+            zeroAreaFaces = problems['zeroAreaFaces']
+            report['zeroAreaFaces'] += zeroAreaFaces.size
+            report['degenerateTriangles'] += problems['degenerateTriangles']
+            if zeroAreaFaces.size:
+                cmds.delete(['%s.f[%d]' % (mesh, face) for face in zeroAreaFaces])
+                #Removing every face deletes the mesh
+                if not cmds.objExists(mesh):
+                    continue
+                #Deleting faces renumbers the vertices
+                self._meshData.invalidate(mesh)
+            meshData = self._meshData.get(mesh)
+            duplicateVertices = UE4HelperMeshData.findDuplicateVertices(meshData.array('points', 3), tolerance)
+            if duplicateVertices.size:
+                vertexCount = meshData.vertexCount()
+                cmds.polyMergeVertex(['%s.vtx[%d]' % (mesh, vertex) for vertex in duplicateVertices],
+                                     d=tolerance)
+                self._meshData.invalidate(mesh)
+                meshData = self._meshData.get(mesh)
+                report['duplicateVertices'] += vertexCount - meshData.vertexCount()
+            report['nonManifoldEdges'] += UE4HelperMeshData.findNonManifoldEdges(meshData.array('faceCounts'),
+                                                               meshData.array('faceConnects'))
+        fileName = mainMesh.split('|')[-1]
+        print('Cleaned: %s welded %d vertices and removed %d zero area faces, '
+              'found %d degenerate triangles in the remaining faces' % (
+              fileName, report['duplicateVertices'], report['zeroAreaFaces'],
+              report['degenerateTriangles']))
+        if report['nonManifoldEdges']:
+            cmds.warning('%s has non-manifold edges: %d' % (fileName, report['nonManifoldEdges']))
+
+    def _validateLightmap(self, mainMesh, resolution, *args):
+        """
+        Checks the second UV set of the render mesh and LODs under mainMesh
+        for overlapping, out of range and unmapped UVs and estimates the
+        lightmap texel density of each.
+
+        Returns:
+            List of strings describing the problems found
+        """
+        problems = []
+        for mesh in self._meshShapes(mainMesh):
+            #Collision meshes do not need lightmaps
+            if '_Collision|' in mesh:
+                continue
+            meshName = mesh.split('|')[-2]
+            meshData = self._meshData.get(mesh)
+            uvSets = meshData.uvSetNames()
+            if len(uvSets) < 2:
+                problems.append('%s has no lightmap UV set' % meshName)
+                continue
+            result = UE4HelperMeshData.checkLightmapUVs(meshData, uvSets[1], resolution)
+            if result['overlappingTexels']:
+                problems.append('%s has %d overlapping islands covering %d texels' % (
+                    meshName, result['overlappingIslands'], result['overlappingTexels']))
+            if result['foldedIslands']:
+                problems.append('%s has %d folded islands covering %d texels' % (
+                    meshName, result['foldedIslands'], result['foldedTexels']))
+            if result['outOfRangeIslands']:
+                problems.append('%s has %d islands outside 0-1 space' % (
+                    meshName, result['outOfRangeIslands']))
+            if result['unmappedFaces']:
+                problems.append('%s has %d faces without lightmap UVs' % (
+                    meshName, result['unmappedFaces']))
+            #Texel density is the square root of texel area over surface area
+            if result['surfaceArea']:
+                print('Lightmap: %s %.2f texels/cm' % (
+                    meshName, resolution * (result['uvArea'] / result['surfaceArea']) ** 0.5))
+        return problems
+
+    def _validateLightmaps(self, renderMeshNames, *args):
+        """
+        Validates the lightmaps of every render mesh name in one batch.
+        Invalid assets are removed when 'Block Invalid Lightmaps' is set.
+
+        Returns:
+            List of render mesh names that can be exported
+
+        Warnings:
+            'NumPy is required to validate lightmaps'
+            'Lightmap: '
+            'Not exporting invalid lightmaps: '
+        """
+        if numpy is None:
+            cmds.warning('NumPy is required to validate lightmaps')
+            return renderMeshNames
+        resolution = self._settings.getint('settings', 'lightmapResolution')
+        block = self._settings.getboolean('settings', 'blockInvalidLightmaps')
+        validMeshNames = []
+        invalidMeshNames = []
+        for renderMeshName in renderMeshNames:
+            problems = self._validateLightmap(self._findMainMesh(renderMeshName), resolution)
+            for problem in problems:
+                cmds.warning('Lightmap: %s' % problem)
+            if problems and block:
+                invalidMeshNames.append(renderMeshName)
+            else:
+                validMeshNames.append(renderMeshName)
+        if invalidMeshNames:
+            cmds.warning('Not exporting invalid lightmaps: %s' % ', '.join(invalidMeshNames))
+        return validMeshNames
+
+    def _reportTangentProblems(self, mainMesh, *args):
+        """
+        Reports the triangles of the render mesh and LODs under mainMesh
+        that UE4 can not build clean tangents for.
+
+        Warnings:
+            ' has no UVs for tangents'
+            'Tangents: '
+        """
+        fileName = mainMesh.split('|')[-1]
+        degenerateUVTriangles = 0
+        mirroredTriangles = 0
+        for mesh in self._meshShapes(mainMesh):
+            #Collision meshes do not need tangents
+            if '_Collision|' in mesh:
+                continue
+            meshData = self._meshData.get(mesh)
+            uvSets = meshData.uvSetNames()
+            if not uvSets:
+                cmds.warning('%s has no UVs for tangents' % mesh.split('|')[-2])
+                continue
+            problems = UE4HelperMeshData.findTangentProblems(meshData, uvSets[0])
+            degenerateUVTriangles += problems['degenerateUVTriangles']
+            mirroredTriangles += problems['mirroredTriangles']
+        print('Tangents: %s has %d mirrored UV triangles' % (fileName, mirroredTriangles))
+        if degenerateUVTriangles:
+            cmds.warning('Tangents: %s has %d triangles with degenerate UVs' % (
+                fileName, degenerateUVTriangles))
+
     def _findCollisionType(self, mesh, *args):
         """
         Using history to find what type of collision to use per mesh
@@ -392,25 +743,27 @@ class UE4Helper(object):
             'Mesh reference folder needs to be set'
             'No mesh references in reference folder'
         """
-        menuItems = cmds.optionMenu(self._refOptionMenu, q=True, ill=True)
-        if menuItems:
-            cmds.deleteUI(menuItems)
+        cmds.textScrollList(self._refList, e=True, removeAll=True)
         if not self._settings.get('settings', 'modelrefdir'):
             cmds.warning('Mesh reference folder needs to be set')
-            cmds.menuItem(l='Set reference folder', p=self._refOptionMenu)
+            cmds.textScrollList(self._refList, e=True, append=['Set reference folder'])
             return
         dirFiles = self._settings.referenceMeshes()
         if not dirFiles:
             cmds.warning('No mesh references in reference folder')
-            cmds.menuItem(l='No models in folder', p=self._refOptionMenu)
-        for dirFile in dirFiles:
-            cmds.menuItem(l=dirFile, parent=self._refOptionMenu)
+            cmds.textScrollList(self._refList, e=True, append=['No models in folder'])
+            return
+        cmds.textScrollList(self._refList, e=True, append=dirFiles)
 
     def _importReference(self, *args):
         """
-        Imports a reference from the reference directory
+        Imports the selected references from the reference directory into the
+        reference namespace. Files are read ahead in background threads while
+        Maya imports them one at a time, then laid out on a grid past the
+        references already in the scene.
 
         Warnings:
+            'No references selected'
             'File not found: '
         """
         modelrefdir = self._settings.get('settings', 'modelrefdir')
@@ -420,16 +773,49 @@ class UE4Helper(object):
                 return
             else:
                 self._updateReferenceUi()
-        file = cmds.optionMenu(self._refOptionMenu, q=True, value=True)
-        if file == 'No models in folder':
+            modelrefdir = self._settings.get('settings', 'modelrefdir')
+        #Skips placeholder items such as 'No models in folder'
+        referenceFiles = self._settings.referenceMeshes() or []
+        files = [file for file in cmds.textScrollList(self._refList, q=True, si=True) or []
+                 if file in referenceFiles]
+        if not files:
+            cmds.warning('No references selected')
             self._updateReferenceUi()
             return
-        filePath = modelrefdir + cmds.optionMenu(self._refOptionMenu, q=True, value=True)
-        if not path.isfile(filePath):
-            cmds.warning('File not found: %s' % filePath)
-            self._updateReferenceUi()
-            return
-        cmds.file(filePath, i=True)
+        filePaths = []
+        for file in files:
+            filePath = modelrefdir + file
+            if not path.isfile(filePath):
+                cmds.warning('File not found: %s' % filePath)
+                self._updateReferenceUi()
+                continue
+            filePaths.append(filePath)
+        #Groups from earlier imports are found before new ones are added
+        existingGroups = cmds.ls('%s:REF_*' % REFERENCE_NAMESPACE, assemblies=True, l=True)
+        occupiedBounds = cmds.exactWorldBoundingBox(existingGroups) if existingGroups else None
+        referenceGroups = []
+        for filePath, prefetched in zip(filePaths, prefetchFiles(filePaths)):
+            prefetched.wait()
+            newNodes = cmds.file(filePath, i=True, ns=REFERENCE_NAMESPACE,
+                                 mergeNamespacesOnClash=True, rnn=True) or []
+            rootNodes = [node for node in cmds.ls(newNodes, type='transform', l=True)
+                         if node.count('|') == 1]
+            if not rootNodes:
+                continue
+            #Groups each file so it is moved as one
+            groupName = 'REF_' + re.sub(r'\W', '_', path.splitext(path.basename(filePath))[0])
+            referenceGroups.append(cmds.group(rootNodes, n='%s:%s' % (REFERENCE_NAMESPACE, groupName)))
+        bounds = [cmds.exactWorldBoundingBox(group) for group in referenceGroups]
+        offsets = UE4HelperMeshData.gridLayout(bounds, REFERENCE_SPACING, occupiedBounds)
+        for group, offset in zip(referenceGroups, offsets):
+            cmds.move(offset[0], offset[1], offset[2], group, r=True)
+
+    def _removeReferences(self, *args):
+        """
+        Deletes every reference imported into the reference namespace.
+        """
+        if cmds.namespace(exists=REFERENCE_NAMESPACE):
+            cmds.namespace(rm=REFERENCE_NAMESPACE, deleteNamespaceContent=True)
 
     def _renameMesh(self, *args):
         """
@@ -489,30 +875,79 @@ class UE4Helper(object):
 
     def _convertUnits(self, fromLeftToRight, *args):
         """
-        Uses cmds.convertUnit to update textfields relating to units
+        Uses convertUnits to update textfields relating to units.
+        Multiple values can be separated by commas or spaces.
+
+        Warnings:
+            'Values to convert must be numbers: '
         """
-        units = {'Millimeter':'mm', 'Centimeter':'cm', 'Meter':'m', 'Kilometer':'km', 
-             'Inch':'in', 'Foot':'ft', 'Yard':'yd', 'Mile':'mi'}
-        value = 0
+        text = ''
         unit1 = ''
         unit2 = ''
         if fromLeftToRight == True:
-            value = cmds.textField("ConvertValue1", q=True, tx=True)
-            unit1 = units[cmds.optionMenu(self._unit1Option, q=True, value=True)]
-            unit2 = units[cmds.optionMenu(self._unit2Option, q=True, value=True)]
+            text = cmds.textField("ConvertValue1", q=True, tx=True)
+            unit1 = cmds.optionMenu(self._unit1Option, q=True, value=True)
+            unit2 = cmds.optionMenu(self._unit2Option, q=True, value=True)
         else:
-            value = cmds.textField("ConvertValue2", q=True, tx=True)
-            unit1 = units[cmds.optionMenu(self._unit2Option, q=True, value=True)]
-            unit2 = units[cmds.optionMenu(self._unit1Option, q=True, value=True)]
-        converted = str(cmds.convertUnit(value, f=unit1, t=unit2))
-        #Removes unit at end of string
-        if converted[-2:].isalpha():  #CM already is removed
-            converted = converted[:-2]
+            text = cmds.textField("ConvertValue2", q=True, tx=True)
+            unit1 = cmds.optionMenu(self._unit2Option, q=True, value=True)
+            unit2 = cmds.optionMenu(self._unit1Option, q=True, value=True)
+        try:
+            values = [float(value) for value in text.replace(',', ' ').split()]
+        except ValueError:
+            cmds.warning('Values to convert must be numbers: %s' % text)
+            return
+        converted = ', '.join('%.10g' % value for value in convertUnits(values, unit1, unit2))
         if fromLeftToRight == True:
             cmds.textField("ConvertValue2", e=True, tx=converted)
         else:
             cmds.textField("ConvertValue1", e=True, tx=converted)
 
+    def _selectedAssets(self, *args):
+        """
+        Finds the SM_ root of each selected object or component, or every SM_
+        asset in the scene when nothing is selected.
+
+        Returns:
+            List of long names of the asset roots
+        """
+        #Components are resolved to the objects they belong to
+        selection = cmds.ls(sl=True, l=True, o=True)
+        if not selection:
+            return cmds.ls('SM_*', assemblies=True, l=True, type='transform')
+        assets = []
+        for selected in selection:
+            asset = '|' + selected.split('|')[1]
+            if asset in assets or not asset[1:].startswith('SM_'):
+                continue
+            if cmds.ls(asset, type='transform'):
+                assets.append(asset)
+        return assets
+
+    def normalizeUnits(self, *args):
+        """
+        Rescales the selected or all SM_ assets from the left converter unit
+        to centimeters. When 'Normalize Vertices' is set the scale is frozen
+        into the vertex data so the transforms stay frozen. Both are undoable.
+
+        Warnings:
+            'No assets to normalize'
+        """
+        assets = self._selectedAssets()
+        if not assets:
+            cmds.warning('No assets to normalize')
+            return
+        fromUnit = cmds.optionMenu(self._unit1Option, q=True, value=True)
+        factor = convertUnits(1.0, fromUnit, 'Centimeter')
+        if factor == 1.0:
+            return
+        #Scales every asset around the world origin in one call
+        cmds.scale(factor, factor, factor, assets, r=True, p=(0, 0, 0))
+        if self._settings.getboolean('settings', 'normalizeVertices'):
+            #Freezes the scale into the vertices, child translations and pivots
+            cmds.makeIdentity(assets, apply=True, t=False, r=False, s=True, pn=True)
+        print('Normalized %d assets from %s' % (len(assets), fromUnit))
+
     def createMainGroup(self, renderMeshName='', *args):
         renderMeshGroup = '|SM_%s' % renderMeshName
         isGroup = True
@@ -656,10 +1091,9 @@ class UE4Helper(object):
         #Gets triangle count of mesh
         meshesInfo = []
         for lodMesh in lodMeshes:
-            cmds.select(lodMesh)
             meshInfo = {}
             meshInfo['object'] = lodMesh
-            meshInfo['triangles'] = cmds.polyEvaluate(t=True)
+            meshInfo['triangles'] = self._meshData.triangleCount(self._meshShapes(lodMesh))
             meshesInfo.append(meshInfo)
         cmds.select(cl=True)
 
@@ -705,16 +1139,104 @@ class UE4Helper(object):
         cmds.parent(lodGroup, renderMeshGroup)
         cmds.select(cl=True)
 
+    def autoMatch(self, *args):
+        """
+        Matches each selected loose collision or LOD mesh to the render mesh
+        it overlaps with the closest center, then runs assignCollision or
+        assignLODs once per render mesh.
+
+        Warnings:
+            'No render meshes to match to'
+            'No render mesh overlaps: '
+        """
+        if not self._hasSelection():
+            return
+        matchType = cmds.confirmDialog(title='Auto Match', message='Match selected meshes as',
+            button=['Collision', 'LODs', 'Cancel'], defaultButton='Collision',
+            cancelButton='Cancel', dismissString='Cancel')
+        if matchType == 'Cancel':
+            return
+        candidates = [selected for selected in cmds.ls(sl=True, l=True, type='transform')
+                      if cmds.listRelatives(selected, s=True, type='mesh', ni=True)]
+        #Render meshes are every other mesh not named as a collision or LOD
+        #and not an imported reference
+        candidateSet = set(candidates)
+        renderMeshes = []
+        for renderMesh in set(cmds.listRelatives(cmds.ls(type='mesh', ni=True, l=True), p=True, f=True) or []):
+            renderMeshShort = renderMesh.split('|')[-1]
+            if renderMesh in candidateSet:
+                continue
+            if renderMeshShort.startswith(REFERENCE_NAMESPACE + ':'):
+                continue
+            if any(renderMeshShort.startswith(nameConvention) for nameConvention in ['UBX_', 'USP_', 'UCX_', 'UCP_', 'LOD_']):
+                continue
+            renderMeshes.append(renderMesh)
+        if not renderMeshes:
+            cmds.warning('No render meshes to match to')
+            return
+        matches = UE4HelperMeshData.matchBounds([cmds.exactWorldBoundingBox(mesh) for mesh in renderMeshes],
+                              [cmds.exactWorldBoundingBox(mesh) for mesh in candidates])
+        #UUIDs stay valid while meshes are renamed and reparented
+        matchedMeshes = {}
+        for candidate, match in zip(candidates, matches):
+            if match is None:
+                cmds.warning('No render mesh overlaps: %s' % candidate)
+                continue
+            matchedMeshes.setdefault(match, []).append(cmds.ls(candidate, uuid=True)[0])
+        renderMeshUuids = cmds.ls(renderMeshes, uuid=True)
+        for match, candidateUuids in sorted(matchedMeshes.items()):
+            renderMesh = cmds.ls(renderMeshUuids[match], l=True)[0]
+            cmds.select([cmds.ls(uuid, l=True)[0] for uuid in candidateUuids])
+            cmds.select(renderMesh, add=True)
+            if matchType == 'Collision':
+                self.assignCollision()
+            else:
+                self.assignLODs()
+        cmds.select(cl=True)
+
     def export(self, *args):
         """
-        Exports all meshes selected using ExportGroup Class and
-        prompt the user to select export folder if it is not set.
+        Exports all selected meshes.
+        """
+        self._export(False)
+
+    def resumeExport(self, *args):
+        """
+        Exports all selected meshes skipping the files the export journal
+        has as complete and unchanged on disk.
+        """
+        self._export(True)
+
+    def _exportFile(self, journal, filePath, options, *args):
+        """
+        Exports the selection to a temporary file and renames it to filePath
+        when complete so a crash never leaves a half written file.
+        """
+        fileName = path.basename(filePath)
+        root, extension = path.splitext(filePath)
+        tempPath = root + EXPORT_TEMP_SUFFIX + extension
+        journal.started(fileName)
+        cmds.file(tempPath, exportSelected=True, force=True, **options)
+        try:
+            rename(tempPath, filePath)
+        except OSError:
+            #Windows can not rename over an existing file
+            remove(filePath)
+            rename(tempPath, filePath)
+        journal.completed(fileName, filePath)
+        print('Exported: ' + fileName)
+
+    def _export(self, resume, *args):
+        """
+        Exports all meshes selected and prompt the user to select export
+        folder if it is not set. Each file is recorded in the export journal.
         """
         if not self._hasSelection():
             return
         if self._settings.get('settings', 'exportdir') == '':
-            if self._settings.updateConfig(menuExportDir, 'exportdir') == 'canceled':
+            if self._settings.updateConfig(self._menuExportDir, 'exportdir') == 'canceled':
                 return
+        exportDir = self._settings.get('settings', 'exportDir')
         exportMeshes = cmds.ls(selection=True, l=True)
         #Checks for duplicate objects selected
         for i in range(len(exportMeshes)):
@@ -722,36 +1244,70 @@ class UE4Helper(object):
 
         #Removes duplicate items
         exportMeshes = list(set(exportMeshes))
-        for renderMeshName in exportMeshes:
-            meshes = self._getMeshes(renderMeshName)
-            if meshes:
-                mainMesh = meshes[0]
-            else:
-                mainMesh = renderMeshName
-            fileName = mainMesh.split('|')[-1]
-            path = self._settings.get('settings', 'exportDir') + fileName
-            position = cmds.xform(mainMesh, ws=True, q=True, t=True)
-            rotation = cmds.xform(mainMesh, ws=True, q=True, ro=True)
-            cmds.select(d=True)
-            #Center Meshes
-            if self._settings.getboolean('settings', 'centerMeshes'):
-               cmds.xform(mainMesh, r=True, t=([axis * -1 for axis in position]))
-               cmds.xform(mainMesh, r=True, eu=True, ro=([axis * -1 for axis in rotation]))
-            cmds.select(mainMesh)
-            #FBX export
-            if self._settings.getboolean('settings', 'exportFBX'):
-                cmds.file(path + '.fbx', exportSelected=True, type='FBX export', force=True)
-                print('Exported: ' + fileName + '.fbx')
-            #OBJ export
-            if self._settings.getboolean('settings', 'exportOBJ'):
-                cmds.file(path + '.obj', exportSelected=True, type='OBJexport', force=True, op="materials=0")
-                print('Exported: ' + fileName + '.obj')
-            cmds.select(d=True)
-            #Decenter Meshes
-            if self._settings.getboolean('settings', 'centerMeshes'):
-                cmds.xform(mainMesh, r=True, eu=True, ro=rotation)
-                cmds.xform(mainMesh, r=True, t=position)
-            cmds.select(d=True)
+        exportTypes = []
+        if self._settings.getboolean('settings', 'exportFBX'):
+            exportTypes.append(('.fbx', {'type':'FBX export'}))
+        if self._settings.getboolean('settings', 'exportOBJ'):
+            exportTypes.append(('.obj', {'type':'OBJexport', 'op':'materials=0'}))
+        #Removes files left half written by a crash
+        for file in listdir(exportDir):
+            if any(file.endswith(EXPORT_TEMP_SUFFIX + extension) for extension, options in exportTypes):
+                remove(exportDir + file)
+        journal = ExportJournal(exportDir, resume)
+        fbxSettings = {}
+        try:
+            if resume:
+                remainingMeshes = []
+                for renderMeshName in exportMeshes:
+                    fileName = self._findMainMesh(renderMeshName).split('|')[-1]
+                    if all(journal.isComplete(fileName + extension) for extension, options in exportTypes):
+                        print('Skipped: ' + fileName)
+                    else:
+                        remainingMeshes.append(renderMeshName)
+                exportMeshes = remainingMeshes
+            cleanupMeshes = self._settings.getboolean('settings', 'cleanupMeshes')
+            if cleanupMeshes and numpy is None:
+                cmds.warning('NumPy is required to cleanup meshes, exporting without cleanup')
+                cleanupMeshes = False
+            if self._settings.getboolean('settings', 'validateLightmaps'):
+                exportMeshes = self._validateLightmaps(exportMeshes)
+            #The FBX exporter triangulates and writes the tangents Maya computes
+            exportTangents = self._settings.getboolean('settings', 'exportTangents')
+            if exportTangents:
+                #The artist's FBX settings are restored once exporting is done
+                for flag in ['FBXExportTriangulate', 'FBXExportTangents']:
+                    fbxSettings[flag] = mel.eval('%s -q' % flag)
+                    mel.eval('%s -v true' % flag)
+                if numpy is None:
+                    cmds.warning('NumPy is required to report tangent problems')
+            for renderMeshName in exportMeshes:
+                mainMesh = self._findMainMesh(renderMeshName)
+                fileName = mainMesh.split('|')[-1]
+                position = cmds.xform(mainMesh, ws=True, q=True, t=True)
+                rotation = cmds.xform(mainMesh, ws=True, q=True, ro=True)
+                cmds.select(d=True)
+                if cleanupMeshes:
+                    self._cleanupMeshes(mainMesh)
+                #Center Meshes
+                if self._settings.getboolean('settings', 'centerMeshes'):
+                   cmds.xform(mainMesh, r=True, t=([axis * -1 for axis in position]))
+                   cmds.xform(mainMesh, r=True, eu=True, ro=([axis * -1 for axis in rotation]))
+                if exportTangents and numpy is not None:
+                    self._reportTangentProblems(mainMesh)
+                cmds.select(mainMesh)
+                #FBX and OBJ export
+                for extension, options in exportTypes:
+                    self._exportFile(journal, exportDir + fileName + extension, options)
+                cmds.select(d=True)
+                #Decenter Meshes
+                if self._settings.getboolean('settings', 'centerMeshes'):
+                    cmds.xform(mainMesh, r=True, eu=True, ro=rotation)
+                    cmds.xform(mainMesh, r=True, t=position)
+                cmds.select(d=True)
+        finally:
+            for flag, value in fbxSettings.items():
+                mel.eval('%s -v %s' % (flag, str(bool(value)).lower()))
+            journal.close()
 
     def helpAbout(self, *args):
         """
@@ -807,10 +1363,12 @@ class UE4HelperHowToUse(object):
             'Grid':"You can either set the grid to be scaled to UE4 or Maya de"\
             "fault size. Change the spacing between each grid line by 1, 5, 10"\
             ", 50, 100 cm and increase or decrease the size of the grid.", 
-            'References':"After setting a folder for references the drop down "\
-            "will list all models in the folder. Clicking 'Import' will import"\
-            " the current mesh in the drop down. If new files in the folder are"\
-            " not showing click 'Refresh References' under settings", 
+            'References':"After setting a folder for references the list will"\
+            " show all models in the folder. Clicking 'Import' will import the"\
+            " selected meshes in the list and lay them out on a grid. If new f"\
+            "iles in the folder are not showing click 'Refresh References' und"\
+            "er settings. 'Remove References' deletes all imported references"\
+            ".", 
             'Renaming':"Select a mesh and click 'Rename Mesh'. It will give th"\
             "e current name of the mesh. Type what you want to change it to an"\
             "d press 'enter' to rename. If the mesh is part of an LOD or colli"\
@@ -819,15 +1377,39 @@ class UE4HelperHowToUse(object):
             "select target mesh, then click 'Assign Collision'. You do not nee"\
             "d to reselect meshes that are already collisions for the target m"\
             "esh.\n\nCollision is based off the construction history."\
-            "\nUSP: Sphere\t\tUBX: Box\nUCP: Cylinder\tUCX: Anything else", 
+            "\nUSP: Sphere\t\tUBX: Box\nUCP: Cylinder\tUCX: Anything else"\
+            "\n\n'Auto Match' matches each selected mesh to the render mesh "\
+            "it overlaps with the closest center and assigns it as collision "\
+            "or an LOD.", 
             'LODs':"Select multiple meshes and press 'Assign LODs'. It will cre"\
             "ate an LOD group based off the triangle count of each selected me"\
             "sh and will be named based off the mesh with the most triangles.", 
             'Exporting':"Select a single or multiple meshes and click 'Export'"\
             ". It will export each mesh including LODs and Collision. All sett"\
-            "ings for exporting can be found under the settings menu.", 
+            "ings for exporting can be found under the settings menu.\n\nWith"\
+            " 'Cleanup Meshes' set, zero area faces are removed and duplicate "\
+            "vertices are welded before exporting. The distance used is cleanu"\
+            "ptolerance in UE4Helper.ini.\n\n'Validate Lightmaps' checks th"\
+            "e second UV set for overlaps, folded islands, UVs outside 0-1 and "\
+            "missing UVs, and prints the texel density of each LOD. The grid s"\
+            "ize is lightmap"\
+            "resolution in UE4Helper.ini. Set 'Block Invalid Lightmaps' to ski"\
+            "p exporting meshes with lightmap problems.\n\nEach file is reco"\
+            "rded in UE4Helper_export.journal in the export folder. If an exp"\
+            "ort is interrupted, select the same meshes and click 'Resume Exp"\
+            "ort' to skip the files already exported.\n\n'Export FBX Tangen"\
+            "ts' turns on the FBX exporter's Triangulate and Tangents options "\
+            "while exporting, so the FBX holds Maya's triangulation and the t"\
+            "angents Maya computes from the mesh normals. Triangles with mirr"\
+            "ored or degenerate UVs that give unstable tangents are reported "\
+            "first. Your FBX settings are restored afterwards.", 
             'Converter':"Set the unit type to convert from and to. Type a numb"\
-            "er into either text field and press 'enter' to convert."}
+            "er into either text field and press 'enter' to convert. Separate"\
+            " several numbers with commas or spaces to convert them all.\n\n"\
+            "'Normalize Units' rescales the selected or all SM_ assets from th"\
+            "e left unit to centimeters. Set 'Normalize Vertices' in the setti"\
+            "ngs to freeze the scale into the vertices and keep the transforms"\
+            " frozen."}
         section = cmds.textScrollList(self._sections, q=True, si=True)[0]
         cmds.scrollField(self._infoText, e=True, tx=information[section])
 
@@ -0,0 +1,766 @@
+###############################################
+# Bulk mesh data access and NumPy mesh checks #
+# for UE4Helper                               #
+#                                             #
+# Maya is only imported by MayaMeshBackend so #
+# everything else runs outside of Maya        #
+###############################################
+
+import array
+import ctypes
+import itertools
+import math
+import time
+#NumPy is not shipped with every Maya version
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+#Arrays read by the same backend call are loaded together
+ARRAY_GROUPS = {'points':'points', 'normals':'normals', 'normalIds':'normalIds',
+                'faceCounts':'vertices', 'faceConnects':'vertices',
+                'triangleCounts':'triangles', 'triangleConnects':'triangles',
+                'u':'uvs', 'v':'uvs', 'uvCounts':'assignedUVs', 'uvIds':'assignedUVs'}
+
+
+class MeshData(object):
+    """
+    Arrays of a mesh, each read from the backend the first time it is used.
+    The backend copies each array into an array.array buffer once. NumPy
+    arrays and memoryviews returned are views of that buffer.
+
+    Arrays:
+        points, normals: flattened x, y, z floats
+        normalIds: normal id of each face vertex
+        faceCounts, faceConnects: vertex count and vertex ids of each face
+        triangleCounts, triangleConnects: triangle count of each face and
+            vertex ids of each triangle
+        u, v, uvCounts, uvIds: per UV set, see uvSetNames()
+    """
+    def __init__(self, load):
+        #load(group, uvSet) returns a dict of the group's arrays
+        self._load = load
+        self._buffers = {}
+        self._uvSetNames = None
+
+    def _buffer(self, name, uvSet):
+        key = (name, uvSet)
+        if key not in self._buffers:
+            for groupName, groupBuffer in self._load(ARRAY_GROUPS[name], uvSet).items():
+                self._buffers[(groupName, uvSet)] = groupBuffer
+        return self._buffers[key]
+
+    def uvSetNames(self):
+        """
+        Returns:
+            List of the UV set names in Maya's order
+        """
+        if self._uvSetNames is None:
+            self._uvSetNames = self._load('uvSetNames', None)
+        return list(self._uvSetNames)
+
+    def array(self, name, columns=1, uvSet=None):
+        """
+        Read only NumPy view of an array, reshaped to rows of columns.
+        """
+        data = self._buffer(name, uvSet)
+        if len(data):
+            view = numpy.frombuffer(data, dtype=data.typecode)
+        else:
+            view = numpy.zeros(0, dtype=data.typecode)
+        view.flags.writeable = False
+        if columns > 1:
+            return view.reshape(-1, columns)
+        return view
+
+    def view(self, name, uvSet=None):
+        """
+        Read only memoryview of an array, or a buffer in Python 2 where
+        array.array does not support memoryview.
+        """
+        if numpy is not None:
+            return memoryview(self.array(name, uvSet=uvSet))
+        data = self._buffer(name, uvSet)
+        try:
+            return memoryview(data)
+        except TypeError:
+            return buffer(data)
+
+    def vertexCount(self):
+        return len(self._buffer('points', None)) // 3
+
+    def triangleCount(self):
+        return len(self._buffer('triangleConnects', None)) // 3
+
+
+def rawArray(typecode, address, count):
+    """
+    Copies count values of typecode at address into an array.array with a
+    single memory copy.
+    """
+    data = array.array(typecode)
+    size = data.itemsize * count
+    if hasattr(data, 'frombytes'):
+        data.frombytes((ctypes.c_char * size).from_address(address))
+    else:
+        #Python 2 arrays only read strings
+        data.fromstring(ctypes.string_at(address, size))
+    return data
+
+
+class MayaMeshBackend(object):
+    """
+    Reads mesh shapes with one bulk call per array and reports changes to
+    them through node dirty callbacks. Points and normals are copied
+    straight from Maya's raw buffers. Meshes are keyed by UUID so renaming
+    or reparenting a mesh keeps its cached data.
+    """
+    def __init__(self):
+        import maya.cmds as cmds
+        import maya.OpenMaya as om1
+        import maya.api.OpenMaya as om
+        self._cmds = cmds
+        self._om1 = om1
+        self._om = om
+
+    def _rawFloats(self, dagPath, getRaw, count):
+        if not count:
+            return array.array('f')
+        #Raw buffers are only exposed by the 1.0 API
+        selection = self._om1.MSelectionList()
+        selection.add(dagPath.fullPathName())
+        rawPath = self._om1.MDagPath()
+        selection.getDagPath(0, rawPath)
+        #Maya owns the buffer and may free it on the next edit so it is copied
+        return rawArray('f', int(getRaw(self._om1.MFnMesh(rawPath))), count)
+
+    def key(self, mesh):
+        """
+        Returns:
+            UUID of the mesh node
+        """
+        return self._cmds.ls(mesh, uuid=True)[0]
+
+    def read(self, mesh):
+        """
+        Returns:
+            MeshData of the mesh shape, read when each array is first used
+        """
+        handle = self._om.MObjectHandle(self._om.MSelectionList().add(mesh).getDependNode(0))
+        return MeshData(lambda group, uvSet: self._load(handle, group, uvSet))
+
+    def _load(self, handle, group, uvSet):
+        #The path is looked up on every load in case the mesh was renamed
+        dagPath = self._om.MDagPath.getAPathTo(handle.object())
+        meshFn = self._om.MFnMesh(dagPath)
+        if group == 'uvSetNames':
+            return meshFn.getUVSetNames()
+        if group == 'points':
+            return {'points':self._rawFloats(dagPath, lambda rawFn: rawFn.getRawPoints(),
+                                             meshFn.numVertices * 3)}
+        if group == 'normals':
+            return {'normals':self._rawFloats(dagPath, lambda rawFn: rawFn.getRawNormals(),
+                                              meshFn.numNormals * 3)}
+        if group == 'normalIds':
+            return {'normalIds':array.array('i', meshFn.getNormalIds()[1])}
+        if group == 'vertices':
+            faceCounts, faceConnects = meshFn.getVertices()
+            return {'faceCounts':array.array('i', faceCounts),
+                    'faceConnects':array.array('i', faceConnects)}
+        if group == 'triangles':
+            triangleCounts, triangleConnects = meshFn.getTriangles()
+            return {'triangleCounts':array.array('i', triangleCounts),
+                    'triangleConnects':array.array('i', triangleConnects)}
+        if group == 'uvs':
+            u, v = meshFn.getUVs(uvSet)
+            return {'u':array.array('f', u), 'v':array.array('f', v)}
+        uvCounts, uvIds = meshFn.getAssignedUVs(uvSet)
+        return {'uvCounts':array.array('i', uvCounts), 'uvIds':array.array('i', uvIds)}
+
+    def watch(self, mesh, callback):
+        """
+        Calls callback with the key of mesh whenever the mesh is modified.
+
+        Returns:
+            Id to pass to unwatch
+        """
+        key = self.key(mesh)
+        return self._om.MNodeMessage.addNodeDirtyCallback(
+            self._om.MSelectionList().add(mesh).getDependNode(0),
+            lambda *args: callback(key))
+
+    def watchScene(self, callback):
+        """
+        Calls callback before a new scene is created or a scene is opened.
+
+        Returns:
+            List of ids to pass to unwatch
+        """
+        return [self._om.MSceneMessage.addCallback(message, lambda *args: callback())
+                for message in (self._om.MSceneMessage.kBeforeNew,
+                                self._om.MSceneMessage.kBeforeOpen)]
+
+    def unwatch(self, watchId):
+        self._om.MMessage.removeCallback(watchId)
+
+
+class FakeMeshBackend(object):
+    """
+    Serves meshes from arrays in memory, stored as floats like Maya's, so
+    MeshDataCache and its users can be tested and benchmarked outside of
+    Maya. Faces are fan triangulated and every normal points up.
+    """
+    def __init__(self):
+        self._meshes = {}
+        self._watchers = {}
+        self._sceneWatchers = {}
+        self._nextWatchId = 0
+        self.reads = 0
+
+    def addMesh(self, mesh, points, faceCounts, faceConnects, uvSets=None,
+                triangleConnects=None):
+        """
+        Adds a mesh from rows of x, y, z points, face vertex counts and face
+        vertex ids. uvSets is a list of (name, u, v, uvCounts, uvIds).
+        triangleConnects replaces the fan triangulation for concave faces.
+        """
+        self._meshes[mesh] = {'points':[tuple(point) for point in points],
+                              'faceCounts':list(faceCounts),
+                              'faceConnects':list(faceConnects),
+                              'uvSets':list(uvSets or []),
+                              'triangleConnects':triangleConnects}
+
+    def addGrid(self, mesh, size):
+        """
+        Adds a flat size by size quad grid with one UV set.
+        """
+        points = [(x, 0.0, z) for z in range(size + 1) for x in range(size + 1)]
+        faceConnects = []
+        for z in range(size):
+            for x in range(size):
+                corner = z * (size + 1) + x
+                faceConnects.extend([corner, corner + 1, corner + size + 2, corner + size + 1])
+        u = [point[0] / float(size) for point in points]
+        v = [point[2] / float(size) for point in points]
+        self.addMesh(mesh, points, [4] * size * size, faceConnects,
+                     [('map1', u, v, [4] * size * size, faceConnects)])
+
+    def key(self, mesh):
+        return mesh
+
+    def read(self, mesh):
+        return MeshData(lambda group, uvSet: self._load(self._meshes[mesh], group, uvSet))
+
+    def _load(self, source, group, uvSet):
+        #Counts backend calls the same way MayaMeshBackend makes them
+        self.reads += 1
+        uvSets = dict((uvSetSource[0], uvSetSource[1:]) for uvSetSource in source['uvSets'])
+        if group == 'uvSetNames':
+            return [uvSetSource[0] for uvSetSource in source['uvSets']]
+        if group == 'points':
+            return {'points':array.array('f', [axis for point in source['points'] for axis in point])}
+        if group == 'normals':
+            return {'normals':array.array('f', [0.0, 1.0, 0.0])}
+        if group == 'normalIds':
+            return {'normalIds':array.array('i', [0] * len(source['faceConnects']))}
+        if group == 'vertices':
+            return {'faceCounts':array.array('i', source['faceCounts']),
+                    'faceConnects':array.array('i', source['faceConnects'])}
+        if group == 'triangles':
+            triangleConnects = source['triangleConnects']
+            if triangleConnects is None:
+                triangleConnects = []
+                start = 0
+                for count in source['faceCounts']:
+                    for corner in range(1, count - 1):
+                        triangleConnects.extend([source['faceConnects'][start],
+                                                 source['faceConnects'][start + corner],
+                                                 source['faceConnects'][start + corner + 1]])
+                    start += count
+            return {'triangleCounts':array.array('i', [max(count - 2, 0)
+                                                       for count in source['faceCounts']]),
+                    'triangleConnects':array.array('i', triangleConnects)}
+        u, v, uvCounts, uvIds = uvSets[uvSet]
+        if group == 'uvs':
+            return {'u':array.array('f', u), 'v':array.array('f', v)}
+        return {'uvCounts':array.array('i', uvCounts), 'uvIds':array.array('i', uvIds)}
+
+    def modified(self, mesh):
+        """
+        Notifies watchers of mesh the same way a Maya dirty callback would.
+        """
+        for watchMesh, callback in list(self._watchers.values()):
+            if watchMesh == mesh:
+                callback(mesh)
+
+    def newScene(self):
+        """
+        Removes every mesh and notifies scene watchers the same way opening
+        a scene in Maya would.
+        """
+        for callback in list(self._sceneWatchers.values()):
+            callback()
+        self._meshes = {}
+
+    def watch(self, mesh, callback):
+        self._nextWatchId += 1
+        self._watchers[self._nextWatchId] = (mesh, callback)
+        return self._nextWatchId
+
+    def watchScene(self, callback):
+        self._nextWatchId += 1
+        self._sceneWatchers[self._nextWatchId] = callback
+        return [self._nextWatchId]
+
+    def unwatch(self, watchId):
+        self._watchers.pop(watchId, None)
+        self._sceneWatchers.pop(watchId, None)
+
+
+class MeshDataCache(object):
+    """
+    Caches MeshData per mesh node until the backend reports the mesh changed
+    or a scene is opened. Call close when done to remove the callbacks.
+    """
+    def __init__(self, backend):
+        self._backend = backend
+        self._meshData = {}
+        self._watchIds = {}
+        self._sceneWatchIds = backend.watchScene(self.clear)
+
+    def get(self, mesh):
+        """
+        Returns:
+            MeshData of mesh, reading it from the backend if not cached
+        """
+        key = self._backend.key(mesh)
+        if key not in self._meshData:
+            self._meshData[key] = self._backend.read(mesh)
+            #Watches stay registered so callbacks never remove themselves
+            if key not in self._watchIds:
+                self._watchIds[key] = self._backend.watch(mesh, self._invalidateKey)
+        return self._meshData[key]
+
+    def invalidate(self, mesh):
+        self._invalidateKey(self._backend.key(mesh))
+
+    def _invalidateKey(self, key):
+        self._meshData.pop(key, None)
+
+    def triangleCount(self, meshes):
+        """
+        Returns:
+            Total triangle count of meshes
+        """
+        return sum(self.get(mesh).triangleCount() for mesh in meshes)
+
+    def clear(self):
+        """
+        Drops all cached data and stops watching meshes.
+        """
+        for watchId in self._watchIds.values():
+            self._backend.unwatch(watchId)
+        self._watchIds = {}
+        self._meshData = {}
+
+    def close(self, *args):
+        """
+        Clears the cache and stops watching for new scenes.
+        """
+        self.clear()
+        for watchId in self._sceneWatchIds:
+            self._backend.unwatch(watchId)
+        self._sceneWatchIds = []
+
+
+def findMeshProblems(points, faceCounts, triangleCounts, triangleConnects, tolerance):
+    """
+    Finds degenerate triangles and zero area faces of a mesh using NumPy
+    arrays instead of component queries. Triangles are degenerate when an
+    edge is shorter than tolerance or their area is within tolerance squared.
+
+    Returns:
+        Dictionary with the count of 'degenerateTriangles' left in the faces
+        that are kept and an array of 'zeroAreaFaces' face ids
+    """
+    faceCounts = numpy.asarray(faceCounts, dtype=numpy.int64)
+    triangleCounts = numpy.asarray(triangleCounts, dtype=numpy.int64)
+    corners = points[numpy.asarray(triangleConnects, dtype=numpy.int64).reshape(-1, 3)]
+    edgeLengths = numpy.linalg.norm(corners - numpy.roll(corners, 1, axis=1), axis=2)
+    areas = 0.5 * numpy.linalg.norm(numpy.cross(corners[:, 1] - corners[:, 0],
+                                                corners[:, 2] - corners[:, 0]), axis=1)
+    degenerate = (edgeLengths.min(axis=1) < tolerance) | (
+        areas <= tolerance * tolerance)
+    #Faces are removed when their area is within tolerance or every triangle collapses
+    triangleFaces = numpy.repeat(numpy.arange(len(faceCounts)), triangleCounts)
+    faceAreas = numpy.bincount(triangleFaces, weights=areas, minlength=len(faceCounts))
+    degenerateCounts = numpy.bincount(triangleFaces, weights=degenerate, minlength=len(faceCounts))
+    zeroArea = (faceAreas <= tolerance * tolerance) | (degenerateCounts == triangleCounts)
+    return {'degenerateTriangles':int(numpy.count_nonzero(degenerate & ~zeroArea[triangleFaces])),
+            'zeroAreaFaces':numpy.flatnonzero(zeroArea)}
+
+
+def findDuplicateVertices(points, tolerance):
+    """
+    Finds vertices within tolerance of another vertex by sorting them into
+    cells three times the tolerance on eight grids shifted by half a cell.
+    Pairs split by a cell boundary on one grid share a cell on another, so
+    only vertices sharing a cell are compared. Cells are hashed to one key,
+    a collision only adds pairs the distance test rejects.
+
+    Returns:
+        Array of the ids of the duplicate vertices
+    """
+    points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 3)
+    primes = numpy.array([73856093, 19349663, 83492791], dtype=numpy.int64)
+    duplicate = numpy.zeros(len(points), dtype=bool)
+    if len(points) < 2:
+        return numpy.flatnonzero(duplicate)
+    scaled = points / (tolerance * 3.0)
+    for shift in itertools.product((0.0, 0.5), repeat=3):
+        keys = numpy.floor(scaled + shift).astype(numpy.int64).dot(primes)
+        order = numpy.argsort(keys)
+        sortedKeys = keys[order]
+        #Pairs every vertex with the ones after it in the same cell
+        cellStarts = numpy.flatnonzero(numpy.r_[True, sortedKeys[1:] != sortedKeys[:-1]])
+        cellSizes = numpy.diff(numpy.r_[cellStarts, len(keys)])
+        cellEnds = numpy.repeat(cellStarts + cellSizes, cellSizes)
+        counts = cellEnds - numpy.arange(len(keys)) - 1
+        if not counts.any():
+            continue
+        firsts = numpy.repeat(numpy.arange(len(keys)), counts)
+        seconds = firsts + 1 + numpy.arange(counts.sum()) - numpy.repeat(numpy.cumsum(counts) - counts,
+                                                                          counts)
+        firsts, seconds = order[firsts], order[seconds]
+        close = numpy.linalg.norm(points[firsts] - points[seconds], axis=1) <= tolerance
+        duplicate[firsts[close]] = True
+        duplicate[seconds[close]] = True
+    return numpy.flatnonzero(duplicate)
+
+
+def findNonManifoldEdges(faceCounts, faceConnects):
+    """
+    Counts the edges shared by more than two faces.
+
+    Returns:
+        Number of non-manifold edges
+    """
+    faceCounts = numpy.asarray(faceCounts, dtype=numpy.int64)
+    faceConnects = numpy.asarray(faceConnects, dtype=numpy.int64)
+    if not faceConnects.size:
+        return 0
+    #Pairs each face vertex with the next one around its face
+    faceStarts = numpy.repeat(numpy.cumsum(faceCounts) - faceCounts, faceCounts)
+    nextVertices = numpy.arange(len(faceConnects)) + 1
+    faceEnds = nextVertices == faceStarts + numpy.repeat(faceCounts, faceCounts)
+    nextVertices[faceEnds] = faceStarts[faceEnds]
+    edges = numpy.sort(numpy.column_stack((faceConnects, faceConnects[nextVertices])), axis=1)
+    edgeCounts = numpy.unique(edges[:, 0] * (faceConnects.max() + 1) + edges[:, 1],
+                              return_counts=True)[1]
+    return int(numpy.count_nonzero(edgeCounts > 2))
+
+
+def triangleUVIds(meshData, uvSet):
+    """
+    Maps the corners of Maya's triangulation to the UV ids of uvSet by face
+    and vertex id, so concave faces keep the triangles Maya exports.
+
+    Returns:
+        Array of rows of the 3 UV ids of each triangle, -1 for unmapped faces
+    """
+    faceCounts = numpy.asarray(meshData.array('faceCounts'), dtype=numpy.int64)
+    faceConnects = numpy.asarray(meshData.array('faceConnects'), dtype=numpy.int64)
+    triangleConnects = numpy.asarray(meshData.array('triangleConnects', 3), dtype=numpy.int64)
+    uvCounts = meshData.array('uvCounts', uvSet=uvSet)
+    #UV ids only exist for mapped faces
+    uvIds = numpy.full(len(faceConnects), -1, dtype=numpy.int64)
+    uvIds[numpy.repeat(uvCounts > 0, faceCounts)] = meshData.array('uvIds', uvSet=uvSet)
+    if not len(triangleConnects):
+        return numpy.zeros((0, 3), dtype=numpy.int64)
+    numFaces = len(faceCounts)
+    numVertices = faceConnects.max() + 1
+    faceVertexKeys = numpy.repeat(numpy.arange(numFaces), faceCounts) * numVertices + faceConnects
+    order = numpy.argsort(faceVertexKeys, kind='mergesort')
+    triangleFaces = numpy.repeat(numpy.arange(numFaces), meshData.array('triangleCounts'))
+    cornerKeys = triangleFaces[:, None] * numVertices + triangleConnects
+    return uvIds[order[numpy.searchsorted(faceVertexKeys[order], cornerKeys)]]
+
+
+def uvIslands(uvCounts, uvIds, numUVs):
+    """
+    Labels connected UV shells by propagating the lowest UV id across faces.
+
+    Returns:
+        Array of the island label of each UV
+    """
+    uvCounts = numpy.asarray(uvCounts, dtype=numpy.int64)
+    uvIds = numpy.asarray(uvIds, dtype=numpy.int64)
+    labels = numpy.arange(numUVs)
+    mappedCounts = uvCounts[uvCounts > 0]
+    if not mappedCounts.size:
+        return labels
+    starts = numpy.cumsum(mappedCounts) - mappedCounts
+    while True:
+        faceLabels = numpy.minimum.reduceat(labels[uvIds], starts)
+        newLabels = labels.copy()
+        numpy.minimum.at(newLabels, uvIds, numpy.repeat(faceLabels, mappedCounts))
+        newLabels = newLabels[newLabels]
+        if numpy.array_equal(newLabels, labels):
+            return labels
+        labels = newLabels
+
+
+def checkLightmapUVs(meshData, uvSet, resolution):
+    """
+    Rasterizes Maya's triangulation of a UV set onto a resolution sized texel
+    grid and finds texels covered by more than one island, islands folded
+    over themselves and islands outside of 0-1 space. An island is folded
+    when its triangles wind both ways or two of them cover the same texel.
+
+    Returns:
+        Dictionary with the counts 'overlappingTexels', 'overlappingIslands',
+        'foldedTexels', 'foldedIslands', 'outOfRangeIslands', 'unmappedFaces',
+        the 0-1 space 'uvArea' and the 'surfaceArea' of the mesh
+    """
+    uvCounts = numpy.asarray(meshData.array('uvCounts', uvSet=uvSet), dtype=numpy.int64)
+    uvIds = numpy.asarray(meshData.array('uvIds', uvSet=uvSet), dtype=numpy.int64)
+    uvs = numpy.column_stack((meshData.array('u', uvSet=uvSet),
+                              meshData.array('v', uvSet=uvSet))).astype(numpy.float64)
+    islands = uvIslands(uvCounts, uvIds, len(uvs))
+    outside = numpy.any((uvs < 0.0) | (uvs > 1.0), axis=1)
+    triangles = triangleUVIds(meshData, uvSet)
+    #Surface area uses the same triangles as the UVs
+    points = meshData.array('points', 3).astype(numpy.float64)
+    pointCorners = points[numpy.asarray(meshData.array('triangleConnects', 3), dtype=numpy.int64)]
+    surfaceArea = 0.5 * numpy.linalg.norm(numpy.cross(pointCorners[:, 1] - pointCorners[:, 0],
+                                                      pointCorners[:, 2] - pointCorners[:, 0]),
+                                          axis=1).sum()
+    triangles = triangles[numpy.all(triangles >= 0, axis=1)]
+    corners = uvs[triangles] * resolution
+    edge1 = corners[:, 1] - corners[:, 0]
+    edge2 = corners[:, 2] - corners[:, 0]
+    doubleAreas = edge1[:, 0] * edge2[:, 1] - edge1[:, 1] * edge2[:, 0]
+    #Texel bounds of each triangle clamped to the grid
+    lows = numpy.clip(numpy.floor(corners.min(axis=1)), 0, resolution).astype(numpy.int64)
+    highs = numpy.clip(numpy.ceil(corners.max(axis=1)), 0, resolution).astype(numpy.int64)
+    widths = numpy.maximum(highs[:, 0] - lows[:, 0], 0)
+    sizes = widths * numpy.maximum(highs[:, 1] - lows[:, 1], 0)
+    sizes[doubleAreas == 0.0] = 0
+    #Tests the centers of every texel inside the bounds of every triangle
+    candidates = numpy.repeat(numpy.arange(len(triangles)), sizes)
+    offsets = numpy.arange(sizes.sum()) - numpy.repeat(numpy.cumsum(sizes) - sizes, sizes)
+    texels = numpy.column_stack((lows[candidates, 0] + offsets % widths[candidates],
+                                 lows[candidates, 1] + offsets // widths[candidates]))
+    centers = texels + 0.5
+    inside = numpy.ones(len(candidates), dtype=bool)
+    #Centers on a shared edge are only inside for the self overlap test
+    strictlyInside = numpy.ones(len(candidates), dtype=bool)
+    sign = numpy.sign(doubleAreas[candidates])
+    for start, end in [(0, 1), (1, 2), (2, 0)]:
+        edge = corners[candidates, end] - corners[candidates, start]
+        offset = centers - corners[candidates, start]
+        side = (edge[:, 0] * offset[:, 1] - edge[:, 1] * offset[:, 0]) * sign
+        inside &= side >= 0.0
+        strictlyInside &= side > 0.0
+    texelIds = texels[:, 1] * resolution + texels[:, 0]
+    texelIslands = islands[triangles[candidates, 0]]
+    pairs = numpy.unique(numpy.column_stack((texelIds[inside], texelIslands[inside])), axis=0)
+    overlapTexelIds, islandCounts = numpy.unique(pairs[:, 0], return_counts=True)
+    overlapping = numpy.isin(pairs[:, 0], overlapTexelIds[islandCounts > 1])
+    #Texels covered more than once by the same island
+    foldedPairs, pairCounts = numpy.unique(
+        numpy.column_stack((texelIds[strictlyInside], texelIslands[strictlyInside])),
+        axis=0, return_counts=True)
+    foldedPairs = foldedPairs[pairCounts > 1]
+    #Islands with triangles wound both ways
+    triangleIslands = islands[triangles[:, 0]]
+    flipped = numpy.intersect1d(triangleIslands[doubleAreas > 0.0],
+                                triangleIslands[doubleAreas < 0.0])
+    return {'overlappingTexels':int(numpy.count_nonzero(islandCounts > 1)),
+            'overlappingIslands':len(numpy.unique(pairs[overlapping, 1])),
+            'foldedTexels':len(numpy.unique(foldedPairs[:, 0])),
+            'foldedIslands':len(numpy.union1d(foldedPairs[:, 1], flipped)),
+            'outOfRangeIslands':len(numpy.unique(islands[outside])),
+            'unmappedFaces':int(numpy.count_nonzero(uvCounts == 0)),
+            'uvArea':numpy.abs(doubleAreas).sum() / (2.0 * resolution * resolution),
+            'surfaceArea':surfaceArea}
+
+
+def findTangentProblems(meshData, uvSet):
+    """
+    Finds the triangles of Maya's triangulation that UE4 can not build a
+    clean tangent basis for, using the arrays of a mesh's MeshData.
+
+    Returns:
+        Dictionary with the counts 'degenerateUVTriangles' for triangles
+        without UVs or with zero UV area and 'mirroredTriangles' for
+        triangles with flipped UVs
+    """
+    u = meshData.array('u', uvSet=uvSet)
+    if not len(u):
+        return {'degenerateUVTriangles':meshData.triangleCount(), 'mirroredTriangles':0}
+    triangles = triangleUVIds(meshData, uvSet)
+    uvs = numpy.column_stack((u, meshData.array('v', uvSet=uvSet))).astype(numpy.float64)
+    #Unmapped corners index the last UV and are masked as degenerate
+    cornerUVs = uvs[triangles]
+    uvEdge1 = cornerUVs[:, 1] - cornerUVs[:, 0]
+    uvEdge2 = cornerUVs[:, 2] - cornerUVs[:, 0]
+    determinants = uvEdge1[:, 0] * uvEdge2[:, 1] - uvEdge2[:, 0] * uvEdge1[:, 1]
+    degenerate = (numpy.abs(determinants) < 1e-12) | numpy.any(triangles < 0, axis=1)
+    return {'degenerateUVTriangles':int(numpy.count_nonzero(degenerate)),
+            'mirroredTriangles':int(numpy.count_nonzero((determinants < 0.0) & ~degenerate))}
+
+
+def boundsOverlap(bounds1, bounds2):
+    """
+    Checks if two [xmin, ymin, zmin, xmax, ymax, zmax] bounds overlap.
+    """
+    return all(bounds1[axis] <= bounds2[axis + 3] and bounds2[axis] <= bounds1[axis + 3]
+               for axis in range(3))
+
+
+def boundsCenter(bounds):
+    """
+    Returns:
+        Center [x, y, z] of [xmin, ymin, zmin, xmax, ymax, zmax] bounds
+    """
+    return [(bounds[axis] + bounds[axis + 3]) * 0.5 for axis in range(3)]
+
+
+class BoundsGrid(object):
+    """
+    Uniform grid of bounds so overlaps are found by looking up the cells a
+    bounds covers instead of testing every pair. Cell size defaults to the
+    median size of the bounds. Bounds covering more than maxCells cells are
+    kept in a list tested on every query instead of filling the grid.
+    """
+    def __init__(self, bounds, cellSize=0.0, maxCells=64):
+        self._bounds = bounds
+        if cellSize <= 0.0:
+            sizes = sorted(max(bound[axis + 3] - bound[axis] for axis in range(3))
+                           for bound in bounds)
+            if sizes:
+                cellSize = sizes[len(sizes) // 2]
+        self._cellSize = cellSize if cellSize > 0.0 else 1.0
+        self._maxCells = maxCells
+        self._cells = {}
+        self._oversized = []
+        for index, bound in enumerate(bounds):
+            ranges = self._cellRanges(bound)
+            if self._cellCount(ranges) > maxCells:
+                self._oversized.append(index)
+                continue
+            for cell in itertools.product(*ranges):
+                self._cells.setdefault(cell, []).append(index)
+
+    def _cellRanges(self, bounds):
+        """
+        Returns:
+            List of the x, y and z ranges of cells the bounds covers
+        """
+        ranges = []
+        for axis in range(3):
+            low = int(math.floor(bounds[axis] / self._cellSize))
+            high = int(math.floor(bounds[axis + 3] / self._cellSize))
+            ranges.append(range(low, high + 1))
+        return ranges
+
+    def _cellCount(self, ranges):
+        return len(ranges[0]) * len(ranges[1]) * len(ranges[2])
+
+    def overlapping(self, bounds):
+        """
+        Returns:
+            Set of the indices of the grid bounds overlapping bounds
+        """
+        ranges = self._cellRanges(bounds)
+        #Large queries test every bounds instead of walking their cells
+        if self._cellCount(ranges) > self._maxCells:
+            return set(index for index, bound in enumerate(self._bounds)
+                       if boundsOverlap(bounds, bound))
+        found = set(index for index in self._oversized
+                    if boundsOverlap(bounds, self._bounds[index]))
+        for cell in itertools.product(*ranges):
+            for index in self._cells.get(cell, []):
+                if index not in found and boundsOverlap(bounds, self._bounds[index]):
+                    found.add(index)
+        return found
+
+
+def matchBounds(targetBounds, candidateBounds):
+    """
+    Matches each candidate to the overlapping target with the closest center.
+
+    Returns:
+        List with the target index of each candidate or None if nothing overlaps
+    """
+    grid = BoundsGrid(targetBounds)
+    targetCenters = [boundsCenter(bounds) for bounds in targetBounds]
+    matches = []
+    for bounds in candidateBounds:
+        center = boundsCenter(bounds)
+        overlapping = grid.overlapping(bounds)
+        if not overlapping:
+            matches.append(None)
+            continue
+        matches.append(min(overlapping, key=lambda index: sum(
+            (targetCenters[index][axis] - center[axis]) ** 2 for axis in range(3))))
+    return matches
+
+
+def gridLayout(bounds, spacing, occupiedBounds=None):
+    """
+    Lays out bounds on a square grid in X and Z centered on the origin with
+    cells sized by the largest bounds plus spacing and sits them on the ground.
+    When occupiedBounds is given the grid is moved along X to start spacing
+    past it.
+
+    Returns:
+        List of [x, y, z] offsets to move each bounds by
+    """
+    if not bounds:
+        return []
+    columns = int(math.ceil(len(bounds) ** 0.5))
+    rows = int(math.ceil(len(bounds) / float(columns)))
+    cellWidth = max(bound[3] - bound[0] for bound in bounds) + spacing
+    cellDepth = max(bound[5] - bound[2] for bound in bounds) + spacing
+    offsets = []
+    for index, bound in enumerate(bounds):
+        center = boundsCenter(bound)
+        cellX = (index % columns - (columns - 1) * 0.5) * cellWidth
+        cellZ = (index // columns - (rows - 1) * 0.5) * cellDepth
+        offsets.append([cellX - center[0], -bound[1], cellZ - center[2]])
+    if occupiedBounds:
+        shift = occupiedBounds[3] + spacing - min(bound[0] + offset[0]
+                                                  for bound, offset in zip(bounds, offsets))
+        for offset in offsets:
+            offset[0] += shift
+    return offsets
+
+
+def benchmark(size=500, repeats=10):
+    """
+    Times reading a size by size grid through the cache with FakeMeshBackend
+    and prints the results.
+    """
+    backend = FakeMeshBackend()
+    backend.addGrid('grid', size)
+    cache = MeshDataCache(backend)
+    start = time.time()
+    print('Read %d triangles: %.3fs, reads: %d' % (cache.triangleCount(['grid']),
+                                                   time.time() - start, backend.reads))
+    start = time.time()
+    for i in range(repeats):
+        cache.get('grid').view('points')
+    print('Cached views x%d: %.6fs' % (repeats, time.time() - start))
+    backend.modified('grid')
+    start = time.time()
+    cache.get('grid').view('points')
+    print('Read after modify: %.3fs, reads: %d' % (time.time() - start, backend.reads))
+    cache.close()
+
+
+if __name__ == '__main__':
+    benchmark()